@@ -37,23 +37,39 @@ Todo:
     * import/export Kubernetes YAML files
 """
 
+import hashlib
 import logging
+import os
+import pwd
 import re
 import shlex
+from collections import defaultdict
 from functools import wraps
-from pathlib import Path
+from itertools import chain
+from json import JSONEncoder
 
 import salt.utils.hashutils
 import salt.utils.json
 import salt.utils.path
 import salt.utils.yaml
+import yaml
 from salt.exceptions import CommandExecutionError, SaltInvocationError
 
-# try:
-#     import podman_compose
-#     HAS_COMPOSE = True
-# except ImportError:
-#     HAS_COMPOSE = False
+try:
+    import orjson
+
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# The library is used to normalize definitions the same way
+# podman-compose does, if it is importable.
+try:
+    import podman_compose
+
+    HAS_PODMAN_COMPOSE = True
+except ImportError:
+    HAS_PODMAN_COMPOSE = False
 
 log = logging.getLogger(__name__)
 
@@ -69,6 +85,54 @@ VALID_UNIT_TYPES = (
     "timer",
 )
 
+VALID_UNIT_SUFFIXES = tuple(f".{unit_type}" for unit_type in VALID_UNIT_TYPES)
+
+ROOT_SERVICE_DIR = "/etc/systemd/system"
+
+LINGER_DIR = "/var/lib/systemd/linger"
+
+# Prefer the libyaml bindings for reading compose files where only their
+# structure is needed. The compose hash still uses Salt's loader since it
+# needs to arrive at the same data podman-compose hashes.
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Patterns for finding the podman command a generated service unit runs.
+# Multi-line commands are continued with a backslash.
+PODMAN_START_RE = re.compile(
+    r"^ExecStart=[a-z/]+podman start([^\n]*(?:\n+(?!\w+=|[\[#;])[^\n]+)+|[^\n]+)",
+    flags=re.MULTILINE,
+)
+PODMAN_POD_CREATE_RE = re.compile(
+    r"^ExecStartPre=[a-z/]+podman pod create([^\n]*(?:\n+(?!\w+=|[\[#;])[^\n]+)+|[^\n]+)",
+    flags=re.MULTILINE,
+)
+PODMAN_RUN_RE = re.compile(
+    r"^ExecStart=[a-z/]+podman run([^\n]*(?:\n+(?!\w+=|[\[#;])[^\n]+)+|[^\n]+)",
+    flags=re.MULTILINE,
+)
+REQUIRES_RE = re.compile(r"^Requires=", flags=re.MULTILINE)
+
+# podman-compose versions with special pod handling.
+# It seems versions 1.0.0 and 1.0.1 are not tagged.
+PODMAN_COMPOSE_NO_POD_SUPPORT = frozenset(("1.0.2", "1.0.3"))
+PODMAN_COMPOSE_NO_POD_SWITCH = frozenset(("1.0.4",))
+PODMAN_COMPOSE_POD_DEFAULT_FALSE = frozenset(("1.0.6",))
+
+# Service options podman-compose normalizes from a string to a list
+COMPOSE_LIST_KEYS = ("env_file", "security_opt", "volumes")
+
+# Properties queried in bulk via ``systemctl show`` to avoid running
+# separate commands per unit and property.
+SYSTEMCTL_SHOW_PROPERTIES = (
+    "LoadState",
+    "ActiveState",
+    "UnitFileState",
+    "NeedDaemonReload",
+)
+
+# ``systemctl is-active`` returns successfully for these states.
+ACTIVE_UNIT_STATES = ("active", "reloading")
+
 PODMAN_RUN_NO_VALUE_PARAMS = (
     "env-host",
     "http-proxy",
@@ -111,12 +175,39 @@ def __init__(opts):
 
 
 def _which_podman():
-    return salt.utils.path.which("podman")
+    if "compose._which_podman" in __context__:
+        return __context__["compose._which_podman"]
+    path = salt.utils.path.which("podman")
+    # Only cache positive results since podman might be installed later
+    if path:
+        __context__["compose._which_podman"] = path
+    return path
 
 
 def _which_podman_compose():
+    if "compose._which_podman_compose" in __context__:
+        return __context__["compose._which_podman_compose"]
     # this will disregard user-installed podman-compose
-    return salt.utils.path.which("podman-compose")
+    path = salt.utils.path.which("podman-compose")
+    # Only cache positive results since podman-compose might be installed later
+    if path:
+        __context__["compose._which_podman_compose"] = path
+    return path
+
+
+def _binary_id(path):
+    """
+    Helper that returns an identifier for the state of an executable,
+    used to invalidate cached version information after upgrades.
+    """
+
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (path, stat.st_mtime_ns, stat.st_size)
 
 
 def _needs_compose(func):
@@ -145,6 +236,16 @@ def __virtual__():
     )
 
 
+def _json_loads(data):
+    """
+    Parse JSON output, using orjson when it is available since
+    podman ps/inspect output can get large.
+    """
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return salt.utils.json.loads(data)
+
+
 def _run(
     bin_path,
     command,
@@ -163,28 +264,32 @@ def _run(
     json switch works for podman/podman-compose
     """
 
-    args = args or []
-    cmd_args = cmd_args or []
+    # command can consist of multiple words (``generate systemd``) or be empty
+    cmd = [
+        bin_path,
+        *_iter_args(args or []),
+        *command.split(),
+        *_iter_args(cmd_args or []),
+    ]
 
     if json:
-        cmd_args.append(("format", "json"))
-
-    # https://bugs.python.org/issue47002
-    # podman-compose uses argparse, which has problems with --opt '--something'
-    # thus use --opt='--something'
-    args = _parse_args(args, include_equal=True)
-    cmd_args = _parse_args(cmd_args, include_equal=True)
-    cmd = [bin_path] + args + [command] + cmd_args
+        cmd.append("--format=json")
 
     if params is not None:
         cmd += ["--"] + params
 
-    log.info(
-        "Running command%s: %s", f" as user {runas}" if runas else "", " ".join(cmd)
-    )
+    if log.isEnabledFor(logging.INFO):
+        log.info(
+            "Running command%s: %s",
+            f" as user {runas}" if runas else "",
+            shlex.join(cmd),
+        )
 
+    # Pass the argument list as-is to avoid having to quote the arguments
+    # and Salt splitting the command string again.
     out = __salt__["cmd.run_all"](
-        " ".join(cmd),
+        cmd,
+        python_shell=False,
         cwd=cwd,
         env=env,
         runas=runas,
@@ -199,32 +304,26 @@ def _run(
         )
 
     if not out["retcode"] and json:
-        out["parsed"] = salt.utils.json.loads(out["stdout"])
+        out["parsed"] = _json_loads(out["stdout"])
     return out
 
 
-def _parse_args(args, include_equal=False):
-    """
-    Helper for parsing lists of arguments into a flat list.
-    """
-    tpl = "--{}={}" if include_equal else "--{} {}"
-    return [tpl.format(*arg) if isinstance(arg, tuple) else f"--{arg}" for arg in args]
-
-
-def _convert_args(args):
+def _iter_args(args):
     """
-    Helper for converting lists of arguments containing dicts to lists
-    of arguments containing tuples
+    Helper for turning lists of arguments into command-line options.
+    Arguments can be flags, ``(key, value)`` tuples or single-item dicts.
     """
-
-    converted = []
-
+    # https://bugs.python.org/issue47002
+    # podman-compose uses argparse, which has problems with --opt '--something'
+    # thus use --opt='--something'. This also keeps options with their values
+    # in a single list item.
     for arg in args:
         if isinstance(arg, dict):
             arg = next(iter(arg.items()))
-        converted.append(arg)
-
-    return converted
+        if isinstance(arg, tuple):
+            yield f"--{arg[0]}={arg[1]}"
+        else:
+            yield f"--{arg}"
 
 
 def _podman(
@@ -315,22 +414,11 @@ def _systemctl(
     """
 
     args = args or []
-    env = env or []
+    env = dict(env or {})
 
     if runas:
-        uid = _user_info(runas, "uid")
-        xdg_runtime_dir = f"/run/user/{uid}"
-        dbus_session_bus = f"{xdg_runtime_dir}/bus"
-
-        if not Path(dbus_session_bus).exists():
-            raise CommandExecutionError(
-                f"User {runas} does not have lingering enabled. This is required "
-                "to run systemctl as a user that does not have a login session."
-            )
-
         args = ["user"] + args
-        env.append({"XDG_RUNTIME_DIR": xdg_runtime_dir})
-        env.append({"DBUS_SESSION_BUS_ADDRESS": f"unix:path={dbus_session_bus}"})
+        env.update(_user_session_env(runas))
 
     return _run(
         "systemctl",
@@ -360,32 +448,26 @@ def _loginctl(command, cmd_args=None, params=None, expect_error=False):
 
 def _journalctl(
     unit,
+    lines=None,
     runas=None,
     raise_error=True,
     expect_error=False,
     env=None,
 ):
     """
-    Helper for running arbitary ``systemctl`` commands related to podman services.
+    Helper for fetching the most recent ``journalctl`` entries of a unit.
     """
 
-    args = []
-    env = env or []
-
-    if runas:
-        uid = _user_info(runas, "uid")
-        xdg_runtime_dir = f"/run/user/{uid}"
-        dbus_session_bus = f"{xdg_runtime_dir}/bus"
+    args = ["reverse", ("unit", unit)]
+    env = dict(env or {})
 
-        if not Path(dbus_session_bus).exists():
-            raise CommandExecutionError(
-                f"User {runas} does not have lingering enabled. This is required "
-                "to run systemctl as a user that does not have a login session."
-            )
+    if lines is not None:
+        # Let journalctl limit the output instead of reading the whole journal
+        args.append(("lines", lines))
 
-        args = ["user", "reverse"] + [("unit", unit)] + args
-        env.append({"XDG_RUNTIME_DIR": xdg_runtime_dir})
-        env.append({"DBUS_SESSION_BUS_ADDRESS": f"unix:path={dbus_session_bus}"})
+    if runas:
+        args.insert(0, "user")
+        env.update(_user_session_env(runas))
 
     return _run(
         "journalctl",
@@ -398,17 +480,48 @@ def _journalctl(
     )
 
 
+def _user_session_env(user):
+    """
+    Helper that returns the environment variables necessary to
+    run systemctl/journalctl as a user. Raises an error if the user's
+    session bus is unavailable.
+    """
+
+    contextkey = f"compose._user_session_env.{user}"
+    if contextkey not in __context__:
+        uid = _user_info(user, "uid")
+        xdg_runtime_dir = f"/run/user/{uid}"
+        dbus_session_bus = f"{xdg_runtime_dir}/bus"
+
+        if not os.path.exists(dbus_session_bus):
+            raise CommandExecutionError(
+                f"User {user} does not have lingering enabled. This is required "
+                "to run systemctl as a user that does not have a login session."
+            )
+        # Only cache positive results since lingering might be enabled later
+        __context__[contextkey] = {
+            "XDG_RUNTIME_DIR": xdg_runtime_dir,
+            "DBUS_SESSION_BUS_ADDRESS": f"unix:path={dbus_session_bus}",
+        }
+    return __context__[contextkey]
+
+
 def _user_info(user, var=""):
     """
     Helper for inspecting a user account.
     """
 
-    user_info = __salt__["user.info"](user)
+    contextkey = f"compose._user_info.{user}"
+    if contextkey not in __context__:
+        user_info = __salt__["user.info"](user)
 
-    if not user_info:
-        raise SaltInvocationError(
-            f"Could not find user '{user}'. Does the account exist?"
-        )
+        if not user_info:
+            raise SaltInvocationError(
+                f"Could not find user '{user}'. Does the account exist?"
+            )
+        __context__[contextkey] = user_info
+
+    user_info = __context__[contextkey]
     if not var:
         return user_info
 
@@ -439,10 +552,10 @@ def service_dir(user=None):
     """
     if user is None:
         # This module generally assumes Salt is running as root
-        return str(Path("/") / "etc" / "systemd" / "system")
+        return ROOT_SERVICE_DIR
 
     home = _user_info(user, "home")
-    return str(Path(home) / ".config" / "systemd" / "user")
+    return os.path.join(home, ".config", "systemd", "user")
 
 
 def _canonical_unit_name(name):
@@ -453,7 +566,7 @@ def _canonical_unit_name(name):
     """
     if not isinstance(name, str):
         name = str(name)
-    if any(name.endswith(suffix) for suffix in VALID_UNIT_TYPES):
+    if name.endswith(VALID_UNIT_SUFFIXES):
         return name
     return f"{name}.service"
 
@@ -464,20 +577,13 @@ def _check_available(name, user=None):
     This function is modified from the official systemd_service module.
     """
 
-    _status = _systemctl_status(name, user)
-
-    # Since version 231, unknown services return an exit status of 4.
-    # This has been out for a long time, so for this module
-    # I'm not bothering to support old versions.
-    # See: https://github.com/systemd/systemd/pull/3385
-    # Also: https://github.com/systemd/systemd/commit/3dced37
-    return 0 <= _status["retcode"] < 4
+    return _systemctl_unit_props(name, user)["LoadState"] != "not-found"
 
 
 def _check_for_unit_changes(name, user=None):
     """
     Check for modified/updated unit files, and run a daemon-reload if any are
-    found.
+    found. Returns True if systemd was reloaded.
     This function is modified from the official systemd_service module.
     """
 
@@ -485,11 +591,36 @@ def _check_for_unit_changes(name, user=None):
     if user is not None:
         contextkey += f".{user}"
 
+    reloaded = False
     if contextkey not in __context__:
         if _untracked_custom_unit_found(name, user) or _unit_file_changed(name, user):
-            systemctl_reload()
+            systemctl_reload(user=user)
+            reloaded = True
         # Set context key to avoid repeating this check
         __context__[contextkey] = True
+    return reloaded
+
+
+def _check_for_units_changes(names, user=None):
+    """
+    Check multiple units for modified/updated unit files. Queries the
+    unit states in bulk before running the checks.
+    """
+
+    unchecked = []
+    for name in names:
+        contextkey = f"compose._check_for_unit_changes.{name}"
+        if user is not None:
+            contextkey += f".{user}"
+        if contextkey not in __context__:
+            unchecked.append(name)
+
+    if unchecked:
+        _systemctl_show(unchecked, user)
+    for num, name in enumerate(unchecked):
+        if _check_for_unit_changes(name, user) and num + 1 < len(unchecked):
+            # Reloading dropped the cached unit states, query the rest in bulk again
+            _systemctl_show(unchecked[num + 1 :], user)
 
 
 def _clear_context():
@@ -501,7 +632,15 @@ def _clear_context():
     # raise a RuntimeError.
     for key in list(__context__):
         try:
-            if key.startswith("compose._systemctl_status."):
+            if key.startswith(
+                (
+                    "compose._systemctl_status.",
+                    "compose._systemctl_show.",
+                    "compose._installed_containers.",
+                    "compose._installed_unit_names.",
+                    "compose.find_compose_file.",
+                )
+            ):
                 __context__.pop(key)
         except AttributeError:
             continue
@@ -528,15 +667,93 @@ def _systemctl_status(name, user=None):
     return __context__[contextkey]
 
 
+def _systemctl_show(names, user=None):
+    """
+    Helper that queries the state of multiple units with a single
+    ``systemctl show`` call. Returns a mapping of the passed names
+    to their properties and caches them in __context__.
+    """
+
+    units = {name: _canonical_unit_name(name) for name in names}
+    if not units:
+        return {}
+
+    out = _systemctl(
+        "show",
+        cmd_args=[("property", ",".join(SYSTEMCTL_SHOW_PROPERTIES))],
+        params=list(units.values()),
+        runas=user,
+    )
+
+    # The properties of each unit are separated by an empty line
+    # and are output in the same order as the units were passed.
+    blocks = out["stdout"].split("\n\n")
+    if len(blocks) != len(units):
+        raise CommandExecutionError(
+            f"Failed parsing systemctl show output for units {', '.join(units)}."
+        )
+
+    ret = {}
+    for (name, unit), block in zip(units.items(), blocks):
+        props = {}
+        for line in block.splitlines():
+            prop, _, val = line.partition("=")
+            props[prop] = val
+        ret[name] = props
+
+        contextkey = f"compose._systemctl_show.{unit}"
+        if user is not None:
+            contextkey += f".{user}"
+        __context__[contextkey] = props
+    return ret
+
+
+def _systemctl_unit_props(name, user=None):
+    """
+    Helper function which leverages __context__ to keep from running 'systemctl
+    show' more than once per unit.
+    """
+
+    contextkey = f"compose._systemctl_show.{_canonical_unit_name(name)}"
+    if user is not None:
+        contextkey += f".{user}"
+
+    if contextkey not in __context__:
+        _systemctl_show([name], user)
+    return __context__[contextkey]
+
+
 def _untracked_custom_unit_found(name, user=None):
     """
     If the passed service name is not available, but a unit file exist in
     /etc/systemd/system, return True. Otherwise, return False.
     This function is modified from the official systemd_service module.
     """
-    services = service_dir(user)
-    unit_path = Path(services) / _canonical_unit_name(name)
-    return unit_path.exists() and not _check_available(name, user)
+    return _canonical_unit_name(name) in (
+        _installed_unit_names(user) or ()
+    ) and not _check_available(name, user)
+
+
+def _installed_unit_names(user=None):
+    """
+    Helper that lists the file names in the service directory of a user.
+    Returns None if the directory does not exist.
+    The result is cached in __context__ until the directory is modified.
+    """
+
+    sdir = service_dir(user)
+    try:
+        dir_mtime = os.stat(sdir).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    contextkey = f"compose._installed_unit_names.{sdir}"
+    cached = __context__.get(contextkey)
+    if cached is None or cached[0] != dir_mtime:
+        with os.scandir(sdir) as entries:
+            cached = (dir_mtime, frozenset(entry.name for entry in entries))
+        __context__[contextkey] = cached
+    return cached[1]
 
 
 def _unit_file_changed(name, user=None):
@@ -545,8 +762,7 @@ def _unit_file_changed(name, user=None):
     returns False.
     This function is modified from the official systemd_service module.
     """
-    sctl_status = _systemctl_status(name, user)["stdout"].lower()
-    return "'systemctl daemon-reload'" in sctl_status
+    return _systemctl_unit_props(name, user)["NeedDaemonReload"] == "yes"
 
 
 def systemctl(
@@ -627,8 +843,7 @@ def systemctl_is_enabled(unit, user=None):
         Salt process user.
     """
 
-    out = _systemctl("is-enabled", params=[unit], runas=user, expect_error=True)
-    return "enabled" == out["stdout"]
+    return _systemctl_show([unit], user)[unit]["UnitFileState"] == "enabled"
 
 
 def systemctl_is_running(unit, user=None):
@@ -650,8 +865,7 @@ def systemctl_is_running(unit, user=None):
         Salt process user.
     """
 
-    out = _systemctl("is-active", params=[unit], runas=user, expect_error=True)
-    return 0 == out["retcode"]
+    return _systemctl_show([unit], user)[unit]["ActiveState"] in ACTIVE_UNIT_STATES
 
 
 def systemctl_start(unit, user=None):
@@ -806,6 +1020,7 @@ def lingering_disable(user):
     """
 
     _loginctl("disable-linger", params=[user])
+    __context__.pop(f"compose._user_session_env.{user}", None)
     return True
 
 
@@ -841,6 +1056,12 @@ def lingering_enabled(user):
         The user to check lingering status for.
     """
 
+    # logind persists the lingering setting as a file per user, which
+    # avoids calling loginctl. The directory is only created once
+    # lingering has been enabled for any user.
+    if os.path.isdir(LINGER_DIR):
+        return os.path.exists(os.path.join(LINGER_DIR, user))
+
     # need to expect error since this command fails if
     # there is no user session
     out = _loginctl("show-user", [("property", "Linger")], [user], expect_error=True)
@@ -857,8 +1078,25 @@ def _get_compose_hash(file):
     Helper to get the hash of a compose file. It needs to normalize the data
     the same way podman-compose does to arrive at the same hash in order to
     avoid unnecessary updates.
+    The result is cached in __context__ until the file contents change.
     """
 
+    stat = os.stat(file)
+    file_id = (stat.st_mtime_ns, stat.st_size)
+    contextkey = f"compose._get_compose_hash.{file}"
+    cached = __context__.get(contextkey)
+    if cached is not None and cached[0] == file_id:
+        return cached[2]
+
+    # The file might have been rewritten with the same contents,
+    # in which case parsing it again can be skipped.
+    raw_hash = salt.utils.hashutils.get_hash(file, "sha256")
+    if cached is not None and cached[1] == raw_hash:
+        __context__[contextkey] = (file_id, raw_hash, cached[2])
+        return cached[2]
+
+    # This does not reuse _load_compose since Salt's loader parses some values
+    # differently (leading-zero ints, timestamps), which would change the hash.
     with open(file, "r") as f:
         definitions = salt.utils.yaml.load(f)
 
@@ -866,42 +1104,81 @@ def _get_compose_hash(file):
         raise CommandExecutionError(f"Compose file {file} is invalid.")
 
     # need to normalize the data
-    try:
-        import os
-
-        import podman_compose
-
+    if HAS_PODMAN_COMPOSE:
         definitions = podman_compose.normalize(definitions)
         definitions = podman_compose.rec_subs(definitions, dict(os.environ))
-    except ImportError:
+    else:
         # This is a very condensed variant of podman-compose functionality
         # and tries to avoid some common cases where the resulting hashes might differ.
         # This does not do variable substitution, but it removes escape chars.
 
-        for srv in definitions["services"]:
-            for key in ("env_file", "security_opt", "volumes"):
-                if key not in srv:
-                    continue
-                srv[key] = [srv[key]] if isinstance(srv[key], str) else srv[key]
+        for srv in definitions["services"].values():
+            for key in COMPOSE_LIST_KEYS:
+                if isinstance(srv.get(key), str):
+                    srv[key] = [srv[key]]
+
+        # Walk the parsed definitions and unescape strings in place
+        # instead of rebuilding every container on the way.
+        stack = [definitions]
+        while stack:
+            node = stack.pop()
+            items = node.items() if isinstance(node, dict) else enumerate(node)
+            for key, val in items:
+                if isinstance(val, str):
+                    if "$$" in val:
+                        node[key] = val.replace("$$", "$")
+                elif isinstance(val, (dict, list)):
+                    stack.append(val)
+
+    # Feed the serialized definitions to the hash in chunks instead of
+    # building the whole string first. This needs to serialize the same
+    # way as salt.utils.json.dumps to arrive at the same hash.
+    digest = hashlib.sha256()
+    encoder = JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+    for chunk in encoder.iterencode(definitions):
+        digest.update(chunk.encode())
+    ret = (digest.hexdigest(), definitions)
+    __context__[contextkey] = (file_id, raw_hash, ret)
+    return ret
 
-        def unescape(val):
-            if isinstance(val, dict):
-                val = {k: unescape(v) for k, v in val.items()}
-            elif isinstance(val, str):
-                if "$$" in val:
-                    val = val.replace("$$", "$")
-            elif hasattr(val, "__iter__"):
-                val = [unescape(i) for i in val]
-            return val
 
-        definitions = unescape(definitions)
+def _installed_containers(
+    composition,
+    project_name=None,
+    container_prefix=None,
+    pod_prefix=None,
+    separator=None,
+    user=None,
+):
+    """
+    Helper that returns the installed units of a composition and the
+    ps-like container definitions parsed from them.
+    The result is cached in __context__ until units are installed,
+    removed or reloaded by this module.
+    """
 
-    return (
-        salt.utils.hashutils.sha256_digest(
-            salt.utils.json.dumps(definitions, separators=(",", ":"))
-        ),
-        definitions,
+    project_name = project_name or _project_to_project_name(composition)
+    contextkey = (
+        f"compose._installed_containers.{composition}.{project_name}."
+        f"{container_prefix}.{pod_prefix}.{separator}"
     )
+    if user is not None:
+        contextkey += f".{user}"
+
+    if contextkey not in __context__:
+        installed_units = list_installed_units(
+            composition,
+            project_name=project_name,
+            container_prefix=container_prefix,
+            pod_prefix=pod_prefix,
+            separator=separator,
+            user=user,
+        )
+        __context__[contextkey] = (
+            installed_units,
+            _inspect_units(installed_units["containers"], user=user),
+        )
+    return __context__[contextkey]
 
 
 def has_changes(
@@ -983,7 +1260,7 @@ def has_changes(
 
     ret = {"changed": [], "missing": missing}
 
-    if status_only and missing["pods"] or missing["containers"]:
+    if status_only and (missing["pods"] or missing["containers"]):
         return True
 
     containers = ps(project_name, user=user)
@@ -998,17 +1275,15 @@ def has_changes(
     # 2) check if all necessary unit files are installed
 
     if not containers:
-        installed_units = list_installed_units(
+        # this checks the service files themselves for ephemeral services
+        containers = _installed_containers(
             composition,
             project_name=project_name,
             pod_prefix=pod_prefix,
             container_prefix=container_prefix,
             separator=separator,
             user=user,
-        )
-        for srv in installed_units["containers"]:
-            # this checks the service files themselves for ephemeral services
-            containers.append(inspect_unit(srv, user=user, podman_ps_if_running=False))
+        )[1]
 
     if not containers:
         if status_only:
@@ -1021,13 +1296,6 @@ def has_changes(
 
     new_hash, definitions = _get_compose_hash(composition)
 
-    try:
-        import podman_compose
-
-        HAS_PODMAN_COMPOSE = True
-    except ImportError:
-        HAS_PODMAN_COMPOSE = False
-
     def _get_env_vars(compose_yaml, service_name):
         info = inspect(compose_yaml, systemd_unit=service_name)
         if info:
@@ -1042,8 +1310,13 @@ def has_changes(
             env_vars[param] = val
         return env_vars
 
+    services = definitions["services"]
+
     for cnt in containers:
-        config_hash = cnt["Labels"].get("io.podman.compose.config-hash")
+        labels = cnt["Labels"]
+        config_hash = labels.get("io.podman.compose.config-hash")
+        service = labels.get("com.docker.compose.service")
+        unit = labels.get("PODMAN_SYSTEMD_UNIT")
 
         if not config_hash:
             raise CommandExecutionError(
@@ -1052,14 +1325,11 @@ def has_changes(
             )
 
         if config_hash != new_hash:
-            if (
-                not skip_removed
-                or cnt["Labels"].get("com.docker.compose.service")
-                in definitions["services"]
-            ):
-                ret["changed"].append(
-                    cnt["Labels"].get("PODMAN_SYSTEMD_UNIT", cnt["Id"])
-                )
+            if not skip_removed or service in services:
+                if status_only:
+                    # No need to inspect the remaining containers
+                    return True
+                ret["changed"].append(unit or cnt["Id"])
                 continue
 
         # env_file content changes are not reflected in the hash, but
@@ -1067,42 +1337,28 @@ def has_changes(
         # (because of https://github.com/containers/podman-compose/pull/949)
         if (
             not HAS_PODMAN_COMPOSE
-            or "PODMAN_SYSTEMD_UNIT" not in cnt["Labels"]
-            or not (
-                env_files := definitions.get("services", {})
-                .get(cnt["Labels"]["com.docker.compose.service"], {})
-                .get("env_file")
-            )
+            or unit is None
+            or not (env_files := services.get(service, {}).get("env_file"))
         ):
             continue
-        if (
-            "env-file"
-            in inspect_unit(cnt["Labels"]["PODMAN_SYSTEMD_UNIT"], user=user, raw=True)[
-                "options"
-            ]
-        ):
+        if "env-file" in inspect_unit(unit, user=user, raw=True)["options"]:
             # podman-compose <1.2.0
             continue
         if not isinstance(env_files, list):
             env_files = [env_files]
         actual_env = _get_env_vars(
-            cnt["Labels"]["com.docker.compose.project.config_files"],
-            cnt["Labels"]["PODMAN_SYSTEMD_UNIT"],
+            labels["com.docker.compose.project.config_files"], unit
         )
         wanted_env = {}
         for env_file in env_files:
             wanted_env.update(**podman_compose.dotenv_to_dict(env_file))
-        wanted_env.update(
-            definitions.get("services", {})
-            .get(cnt["Labels"]["com.docker.compose.service"], {})
-            .get("environment", {})
-        )
+        wanted_env.update(services.get(service, {}).get("environment", {}))
         for wanted_param, wanted_val in wanted_env.items():
             if wanted_param not in actual_env or actual_env[wanted_param] != wanted_val:
-                log.debug(
-                    f"Changed environment variable '{wanted_param}' in '{cnt['Labels']['PODMAN_SYSTEMD_UNIT']}"
-                )
-                ret["changed"].append(cnt["Labels"]["PODMAN_SYSTEMD_UNIT"])
+                log.debug(f"Changed environment variable '{wanted_param}' in '{unit}'")
+                if status_only:
+                    return True
+                ret["changed"].append(unit)
                 break
 
     # This currently does not check for changes in pod service files @TODO
@@ -1166,21 +1422,23 @@ def list_outdated_units(
     container_prefix = container_prefix or default_container_prefix
     pod_prefix = pod_prefix or default_pod_prefix
 
-    installed_units = list_installed_units(
+    containers = _installed_containers(
         composition,
         project_name=project_name,
         container_prefix=container_prefix,
         pod_prefix=pod_prefix,
         separator=separator,
         user=user,
-    )
+    )[1]
 
     new_hash, definitions = _get_compose_hash(composition)
     changed = []
 
-    for srv in installed_units["containers"]:
-        cnt = inspect_unit(srv, user=user, podman_ps_if_running=False)
-        config_hash = cnt["Labels"].get("io.podman.compose.config-hash")
+    services = definitions["services"]
+
+    for cnt in containers:
+        labels = cnt["Labels"]
+        config_hash = labels.get("io.podman.compose.config-hash")
 
         if not config_hash:
             raise CommandExecutionError(
@@ -1189,11 +1447,8 @@ def list_outdated_units(
             )
 
         if config_hash != new_hash:
-            if (
-                cnt["Labels"].get("com.docker.compose.service")
-                in definitions["services"]
-            ):
-                changed.append(cnt["Labels"]["PODMAN_SYSTEMD_UNIT"])
+            if labels.get("com.docker.compose.service") in services:
+                changed.append(labels["PODMAN_SYSTEMD_UNIT"])
 
     # @TODO does not check for changed pod creation arguments atm
     # pod_args = inspect_unit(pod_srv, user=user)
@@ -1202,6 +1457,24 @@ def list_outdated_units(
     return changed
 
 
+def _load_compose(file):
+    """
+    Helper that returns the parsed contents of a compose file.
+    The result is cached in __context__ until the file is modified,
+    so it must not be modified by callers.
+    """
+
+    stat = os.stat(file)
+    file_id = (stat.st_mtime_ns, stat.st_size)
+    contextkey = f"compose._load_compose.{file}"
+    cached = __context__.get(contextkey)
+    if cached is None or cached[0] != file_id:
+        with open(file, "rb") as f:
+            cached = (file_id, yaml.load(f, Loader=YAML_LOADER))
+        __context__[contextkey] = cached
+    return cached[1]
+
+
 def _list_units(
     composition,
     project_name=None,
@@ -1225,10 +1498,9 @@ def _list_units(
     else:
         separator = ""
 
-    with open(composition, "r") as f:
-        definitions = salt.utils.yaml.load(f)
-
+    definitions = _load_compose(composition)
     service_names = []
+    unit_prefix = f"{container_prefix}{separator}"
 
     for srv, conf in definitions["services"].items():
         replicas = int(conf.get("deploy", {}).get("replicas", 1))
@@ -1240,7 +1512,7 @@ def _list_units(
             else:
                 name = name_default
 
-            service_names.append(f"{container_prefix}{separator}{name}")
+            service_names.append(unit_prefix + name)
 
     # podman-compose currently automatically prefixes pods with "pod_"
     # this was not the case in 0.* versions
@@ -1249,17 +1521,22 @@ def _list_units(
     return pod, service_names
 
 
-def _is_unit_installed(service, user):
+def _units_installed(services, user):
     """
-    Helper for checking if a unit file exists.
+    Helper for checking if unit files exist. Yields the service name,
+    whether its unit file exists and the path of the unit file.
     """
 
-    sdir = Path(service_dir(user))
-    if not sdir.exists():
-        return False, None
+    installed = _installed_unit_names(user)
+    if installed is None:
+        for service in services:
+            yield service, False, None
+        return
 
-    path = sdir / (_canonical_unit_name(service))
-    return path.exists(), str(path)
+    sdir = service_dir(user)
+    for service in services:
+        unit = _canonical_unit_name(service)
+        yield service, unit in installed, os.path.join(sdir, unit)
 
 
 def list_missing_units(
@@ -1317,37 +1594,18 @@ def list_missing_units(
         or Salt process user. By default, defaults to the parent dir owner.
     """
 
-    composition = find_compose_file(composition)
-    user = user or _find_user(composition)
-    container_prefix = container_prefix or default_container_prefix
-    pod_prefix = pod_prefix or default_pod_prefix
-
-    pod_name, service_names = _list_units(
+    return _filter_units(
         composition,
+        installed=False,
+        status_only=status_only,
         project_name=project_name,
         container_prefix=container_prefix,
         pod_prefix=pod_prefix,
+        with_pod=should_have_pod,
         separator=separator,
         user=user,
     )
 
-    containers = {}
-    pods = {}
-
-    for service in service_names:
-        is_installed, path = _is_unit_installed(service, user)
-        if not is_installed:
-            containers[service] = path
-
-    is_installed, path = _is_unit_installed(pod_name, user)
-    if not is_installed and should_have_pod:
-        pods[pod_name] = path
-
-    if status_only:
-        return bool(containers or pods)
-
-    return {"containers": containers, "pods": pods}
-
 
 def list_installed_units(
     composition,
@@ -1400,6 +1658,34 @@ def list_installed_units(
         or Salt process user. By default, defaults to the parent dir owner.
     """
 
+    return _filter_units(
+        composition,
+        installed=True,
+        status_only=status_only,
+        project_name=project_name,
+        container_prefix=container_prefix,
+        pod_prefix=pod_prefix,
+        separator=separator,
+        user=user,
+    )
+
+
+def _filter_units(
+    composition,
+    installed,
+    status_only=False,
+    project_name=None,
+    container_prefix=None,
+    pod_prefix=None,
+    with_pod=True,
+    separator=None,
+    user=None,
+):
+    """
+    Helper for listing the service units of a composition whose unit files
+    are either installed or missing.
+    """
+
     composition = find_compose_file(composition)
     user = user or _find_user(composition)
     container_prefix = container_prefix or default_container_prefix
@@ -1414,20 +1700,24 @@ def list_installed_units(
         user=user,
     )
 
-    containers = {}
-    pods = {}
+    if with_pod:
+        service_names.append(pod_name)
 
-    for service in service_names:
-        is_installed, path = _is_unit_installed(service, user)
-        if is_installed:
-            containers[service] = path
+    if status_only:
+        return any(
+            is_installed is installed
+            for _, is_installed, _ in _units_installed(service_names, user)
+        )
 
-    is_installed, path = _is_unit_installed(pod_name, user)
-    if is_installed:
-        pods[pod_name] = path
+    containers = {}
+    pods = {}
 
-    if status_only:
-        return bool(containers or pods)
+    for service, is_installed, path in _units_installed(service_names, user):
+        if is_installed is installed:
+            if service == pod_name:
+                pods[service] = path
+            else:
+                containers[service] = path
 
     return {"containers": containers, "pods": pods}
 
@@ -1520,86 +1810,136 @@ def inspect_unit(unit, user=None, podman_ps_if_running=False, raw=False):
     """
 
     unit = _canonical_unit_name(unit)
-    unit_file = Path(service_dir(user)) / unit
-    if not unit_file.exists():
-        raise SaltInvocationError(f"File '{unit_file}' does not exist.")
-    contents = unit_file.read_text()
-
-    def parse_arguments(args):
-        parsed = {"options": {}, "params": []}
-        args = shlex.split(args)
-        # newline chars mess up the "logic"
-        args = [x for x in args if x not in ["\n"]]
-        cur, num = 0, len(args)
-        options_finished = False
-
-        while cur < num:
-            if not args[cur].startswith("-") or options_finished:
-                options_finished = True
-                parsed["params"].append(args[cur])
-                cur += 1
-                continue
-
-            arg = args[cur].lstrip("-")
-            val = True
-
-            if arg in PODMAN_RUN_NO_VALUE_PARAMS:
-                pass
-            elif cur + 1 < num and not args[cur + 1].startswith("-"):
-                cur += 1
-                val = args[cur]
-            elif "=" in arg:
-                arg, val = arg.split("=", 1)
-
-            if arg in parsed["options"]:
-                if not isinstance(parsed["options"][arg], list):
-                    parsed["options"][arg] = [parsed["options"][arg]]
-                parsed["options"][arg].append(val)
-            else:
-                parsed["options"][arg] = val
-            cur += 1
-        return parsed
+    command, args = _parse_unit(unit, user=user)
 
     # If the container is not created by the service,
     # it has to exist in podman. Better to let it handle ps.
+    if "start" == command:
+        return ps(name=args["params"][0], user=user)
 
-    non_ephemeral = re.findall(
-        r"^ExecStart=[a-z\/]+podman start([^\n]*(?:\n+(?!\w+=|[\[#;])[^\n]+)+|[^\n]+)",
-        contents,
-        flags=re.MULTILINE,
-    )
-    if non_ephemeral:
-        args = parse_arguments(non_ephemeral[0])
-        return ps(name=args["params"][0])
-
-    pod = re.findall(
-        r"^ExecStartPre=[a-z\/]+podman pod create([^\n]*(?:\n+(?!\w+=|[\[#;])[^\n]+)+|[^\n]+)",
-        contents,
-        flags=re.MULTILINE,
-    )
-    if pod:
+    if "pod create" == command:
         # @TODO better parsing? flags are returned as True (python)
-        return parse_arguments(pod[0])
-
-    cnt = re.findall(
-        r"^ExecStart=[a-z\/]+podman run([^\n]*(?:\n+(?!\w+=|[\[#;])[^\n]+)+|[^\n]+)",
-        contents,
-        flags=re.MULTILINE,
-    )
-    if not cnt:
-        raise CommandExecutionError(
-            f"Failed parsing unit {unit}. Was it created by podman?"
-        )
+        return args
 
     if podman_ps_if_running:
         out = ps(systemd_unit=unit, user=user)
         if out:
             return out
 
-    args = parse_arguments(cnt[0])
     if raw:
         return args
 
+    return _unit_args_to_container(unit, args)
+
+
+def _inspect_units(units, user=None):
+    """
+    Helper for inspecting multiple installed container units like
+    ``inspect_unit``. Containers of non-ephemeral units are queried
+    with a single ``podman ps`` call instead of one per unit.
+    """
+
+    containers = []
+    names = []
+
+    for unit in units:
+        unit = _canonical_unit_name(unit)
+        command, args = _parse_unit(unit, user=user)
+        if "start" == command:
+            names.append(args["params"][0])
+        elif "run" == command:
+            containers.append(_unit_args_to_container(unit, args))
+
+    if names:
+        containers.extend(ps(name=names, user=user))
+    return containers
+
+
+def _parse_unit(unit, user=None):
+    """
+    Helper for parsing the podman command an installed service unit runs.
+    Returns a tuple of the podman subcommand (``start``, ``pod create``
+    or ``run``) and its parsed arguments.
+    """
+
+    unit_file = os.path.join(service_dir(user), unit)
+    try:
+        with open(unit_file, "r") as f:
+            contents = f.read()
+    except FileNotFoundError as err:
+        raise SaltInvocationError(f"File '{unit_file}' does not exist.") from err
+
+    # Check for the command first to avoid scanning the whole file
+    # with patterns that cannot match.
+    if "podman start" in contents and (
+        non_ephemeral := PODMAN_START_RE.search(contents)
+    ):
+        return "start", _parse_podman_args(non_ephemeral.group(1))
+
+    if "podman pod create" in contents and (
+        pod := PODMAN_POD_CREATE_RE.search(contents)
+    ):
+        return "pod create", _parse_podman_args(pod.group(1))
+
+    cnt = "podman run" in contents and PODMAN_RUN_RE.search(contents)
+    if not cnt:
+        raise CommandExecutionError(
+            f"Failed parsing unit {unit}. Was it created by podman?"
+        )
+    return "run", _parse_podman_args(cnt.group(1))
+
+
+def _parse_podman_args(args):
+    """
+    Helper for parsing the command line arguments of a podman command
+    found in a service unit.
+    """
+
+    parsed = {"options": {}, "params": []}
+    options = defaultdict(list)
+    # Consume the tokens while splitting instead of building a list first.
+    # This is set up the same way as shlex.split.
+    lex = shlex.shlex(args, posix=True)
+    lex.whitespace_split = True
+    lex.commenters = ""
+    # newline chars mess up the "logic"
+    tokens = (token for token in lex if token != "\n")
+    token = next(tokens, None)
+
+    while token is not None:
+        if not token.startswith("-"):
+            # everything after the first positional argument is a parameter
+            parsed["params"].append(token)
+            parsed["params"].extend(tokens)
+            break
+
+        arg = token.lstrip("-")
+        val = True
+        token = next(tokens, None)
+
+        if arg in PODMAN_RUN_NO_VALUE_PARAMS:
+            pass
+        elif token is not None and not token.startswith("-"):
+            val = token
+            token = next(tokens, None)
+        elif "=" in arg:
+            arg, val = arg.split("=", 1)
+
+        options[arg].append(val)
+
+    # options that were passed only once are returned as a single value
+    parsed["options"] = {
+        arg: vals[0] if len(vals) == 1 else vals for arg, vals in options.items()
+    }
+    return parsed
+
+
+def _unit_args_to_container(unit, args):
+    """
+    Helper for rendering the parsed arguments of a ``podman run`` unit
+    to an output similar to ``podman ps``.
+    """
+
     parsed = {
         # bool(args["options"].get("replace")) not needed
         "AutoRemove": True,
@@ -1613,11 +1953,7 @@ def inspect_unit(unit, user=None, podman_ps_if_running=False, raw=False):
         "Image": args["params"][0],
         "ImageID": None,
         "IsInfra": False,
-        "Labels": {
-            var: val
-            for label in args["options"].get("label", [])
-            for var, val in [label.split("=", 1)]
-        },
+        "Labels": {},
         "Mounts": [],
         "Names": [],
         "Namespaces": {},
@@ -1632,13 +1968,17 @@ def inspect_unit(unit, user=None, podman_ps_if_running=False, raw=False):
         "Status": None,
     }
 
+    labels = args["options"].get("label", [])
+    if not isinstance(labels, list):
+        labels = [labels]
+    parsed["Labels"] = dict(label.partition("=")[::2] for label in labels)
     parsed["Labels"]["PODMAN_SYSTEMD_UNIT"] = unit
 
     if "v" in args["options"]:
         vols = args["options"]["v"]
         if not isinstance(vols, list):
             vols = [vols]
-        parsed["Mounts"] = [vol.split(":", 1)[1] for vol in vols]
+        parsed["Mounts"] = [vol.partition(":")[2] for vol in vols]
 
     if "net" in args["options"]:
         nets = args["options"]["net"]
@@ -1821,27 +2161,21 @@ def install(
     if not pc_pod_support["required"]:
         if create_pod:
             # in versions where the choice is possible, the default is to not create a pod
-            pod_args = _parse_args(_convert_args(pod_args), include_equal=True)
             if not pc_pod_support["pod_default"]:
                 args.append(("in-pod", 1))
-            args.append(("pod-args", "'{}'".format(" ".join(pod_args))))
+            args.append(("pod-args", " ".join(_iter_args(pod_args))))
         elif pc_pod_support["no_pod_switch"]:
             # 1.0.4 (unreleased) created a pod by default
             args.append("no-pod")
         elif pc_pod_support["pod_default"]:
             # The current latest code does not handle a boolean flag correctly,
             # we need to pass in a falsey string @FIXME once it has been fixed
-            args.append(("in-pod", "''"))
+            args.append(("in-pod", ""))
 
     if podman_create_args:
-        parsed_podman_create_args = _parse_args(
-            _convert_args(podman_create_args), include_equal=True
-        )
         # podman-create-args do not exist in podman-compose, but it uses podman-run-args
         # https://github.com/containers/podman-compose/blob/ae6be272b5b74799135e518bc106a0322dcf4771/podman_compose.py#L1341-L1342
-        args.append(
-            ("podman-run-args", "'{}'".format(" ".join(parsed_podman_create_args)))
-        )
+        args.append(("podman-run-args", " ".join(_iter_args(podman_create_args))))
     if remove_orphans:
         cmd_args.append("remove-orphans")
     if force_recreate:
@@ -1853,19 +2187,18 @@ def install(
     if pull:
         cmd_args.append("pull")
 
-    with open(composition, "r") as f:
-        defs = salt.utils.yaml.load(f)
-        if not isinstance(defs, dict):
-            raise SaltInvocationError(
-                f"Compose file at {composition} is malformed, not a dict"
-            )
+    defs = _load_compose(composition)
+    if not isinstance(defs, dict):
+        raise SaltInvocationError(
+            f"Compose file at {composition} is malformed, not a dict"
+        )
 
     out = _podman_compose(
         "up",
         args=args,
         cmd_args=cmd_args,
         runas=user,
-        cwd=str(Path(composition).parent),
+        cwd=os.path.dirname(composition),
     )
 
     present_containers = ps(project_name, status=["created"])
@@ -2020,12 +2353,10 @@ def install_units(
         if separator is not None:
             cmd_args.append(("separator", separator))
     else:
-        cmd_args.append(("separator", "''"))
+        cmd_args.append(("separator", ""))
 
-    cmd_args.append(
-        ("container-prefix", container_prefix if container_prefix else "''")
-    )
-    cmd_args.append(("pod-prefix", pod_prefix if pod_prefix else "''"))
+    cmd_args.append(("container-prefix", container_prefix or ""))
+    cmd_args.append(("pod-prefix", pod_prefix or ""))
 
     if ephemeral:
         cmd_args.append("new")
@@ -2041,8 +2372,8 @@ def install_units(
     if stop_timeout is not None:
         cmd_args.append(("time", stop_timeout))
 
-    # need the definitions for finding the unit names
-    definitions = {}
+    # podman generate systemd only accepts a single container/pod
+    calls = []
     for i in ids:
         extra_cmd_args = []
         if not isinstance(i, str):
@@ -2051,14 +2382,20 @@ def install_units(
                 extra_cmd_args.extend(list(service_overrides[service_name].items()))
             i = i["Id"]
 
-        out = _podman(
-            "generate systemd",
-            cmd_args=cmd_args + extra_cmd_args,
-            params=[i],
-            runas=user,
-            json=True,
+        calls.append(
+            {
+                "command": "generate systemd",
+                "cmd_args": cmd_args + extra_cmd_args,
+                "params": [i],
+                "runas": user,
+                "json": True,
+            }
         )
 
+    # need the definitions for finding the unit names
+    definitions = {}
+    for call in calls:
+        out = _podman(**call)
         for name, unit in out["parsed"].items():
             if name in definitions:
                 raise CommandExecutionError(
@@ -2068,22 +2405,21 @@ def install_units(
 
     if pod and pod_wants:
         pod_name = pod[0]["Name"]
-        definitions[pod_name] = re.sub(
-            r"^Requires=", "Wants=", definitions[pod_name], flags=re.MULTILINE
-        )
+        definitions[pod_name] = REQUIRES_RE.sub("Wants=", definitions[pod_name])
 
     if generate_only:
         return definitions
 
-    cwd = Path(service_dir(user))
+    cwd = service_dir(user)
+    group = __salt__["user.primary_group"](user)
 
     for service_name, service_definitions in definitions.items():
         ret = __salt__["file.manage_file"](
-            cwd / (service_name + ".service"),
+            os.path.join(cwd, service_name + ".service"),
             contents=service_definitions,
             makedirs=True,
             user=user,
-            group=__salt__["user.primary_group"](user),
+            group=group,
             mode="0644",
             sfn=None,
             source=None,
@@ -2105,6 +2441,8 @@ def install_units(
             runas=user,
             cwd=cwd,
         )
+    # the installed units and containers have changed
+    _clear_context()
     # This assumes the name can be autodiscovered @FIXME
     # Previously, this was done with calling systemctl directly
     if enable_units:
@@ -2175,7 +2513,7 @@ def logs(
         args=args,
         runas=user,
         params=params,
-        cwd=str(Path(composition).parent),
+        cwd=os.path.dirname(composition),
     )
 
 
@@ -2249,13 +2587,9 @@ def remove(
 
     # check if the unit files are ephemeral or not
     # a better check would be to run inspect_unit and look for AutoRemove @TODO
-    containers = ps(
-        composition,
-        status=["created", "paused", "stopped", "exited", "unknown"],
-        user=user,
-    )
-
-    containers += pps(composition, user=user)
+    # Pods are only discovered via their containers, so checking for
+    # any leftover containers covers them as well.
+    containers = ps(composition, id_only=True, user=user)
 
     if containers or volumes:
         args = [("file", composition), ("project-name", project_name)]
@@ -2273,8 +2607,12 @@ def remove(
         user=user,
     )
 
-    for unit in list(units["containers"].values()) + list(units["pods"].values()):
-        __salt__["file.remove"](unit)
+    for unit in chain(units["containers"].values(), units["pods"].values()):
+        try:
+            os.unlink(unit)
+        except FileNotFoundError:
+            pass
+    _clear_context()
 
     return True
 
@@ -2296,27 +2634,33 @@ def podman_compose_supports_pods(user=None):
         Salt process user.
     """
 
+    # version() is cached, the rest is cheap
     vers = version(user=user)
 
-    # it seems versions 1.0.0 and 1.0.1 are not tagged
-    unsupported = ["1.0.2", "1.0.3"]
-    no_pod_switch = ["1.0.4"]
-    pod_default_false = ["1.0.6"]
-
     ret = {"supported": True, "required": False}
 
     if vers.startswith("0."):
         ret["required"] = True
-    elif vers.startswith("1.0") and vers in unsupported:
+    elif vers in PODMAN_COMPOSE_NO_POD_SUPPORT:
         ret["required"] = True
         ret["supported"] = False
     else:
-        ret["no_pod_switch"] = vers in no_pod_switch
-        ret["pod_default"] = vers not in pod_default_false
+        ret["no_pod_switch"] = vers in PODMAN_COMPOSE_NO_POD_SWITCH
+        ret["pod_default"] = vers not in PODMAN_COMPOSE_POD_DEFAULT_FALSE
 
     return ret
 
 
+def _ensure_list(var):
+    """
+    Helper for accepting single values where lists are expected.
+    """
+
+    if isinstance(var, (list, tuple)):
+        return var
+    return [var]
+
+
 def pps(
     project=None,
     status=None,
@@ -2379,14 +2723,13 @@ def pps(
         # running matching containers)
         pod_id = pod_id or []
         pods = ps(project=project, pod_only=True, user=user)
-        pod_id += list(set(pods))
+        # containers outside of a pod have an empty pod ID
+        pod_id.extend({pod for pod in pods if pod})
+        if not pod_id:
+            # Without any pod ID filter, all pods would be listed
+            return []
         user = user or _try_find_user(project)
 
-    def ensure_list(var):
-        if not isinstance(var, list):
-            var = [var]
-        return var
-
     for var, fltr_name in [
         (status, "status"),
         (name, "name"),
@@ -2395,11 +2738,13 @@ def pps(
         (cnt_name, "ctr-names"),
     ]:
         if var is not None:
-            for fltr in ensure_list(var):
-                cmd_args.append(("filter", f"{fltr_name}={fltr}"))
+            prefix = f"{fltr_name}="
+            cmd_args.extend(
+                ("filter", prefix + str(fltr)) for fltr in _ensure_list(var)
+            )
 
     if id_only:
-        cmd_args.append(("format", "'{{.ID}}'"))
+        cmd_args.append(("format", "{{.ID}}"))
 
     out = _podman("pod ps", cmd_args=cmd_args, json=not id_only, runas=user)
     if id_only:
@@ -2478,14 +2823,11 @@ def ps(
         if not disable_user_automap:
             user = user or _try_find_user(project)
 
-    def ensure_list(var):
-        if not isinstance(var, list):
-            var = [var]
-        return var
-
     if systemd_unit is not None:
-        for val in ensure_list(systemd_unit):
-            cmd_args.append(("filter", f"label=PODMAN_SYSTEMD_UNIT={val}"))
+        cmd_args.extend(
+            ("filter", "label=PODMAN_SYSTEMD_UNIT=" + str(val))
+            for val in _ensure_list(systemd_unit)
+        )
 
     for var, fltr_name in [
         (status, "status"),
@@ -2494,13 +2836,15 @@ def ps(
         (exited, "exited"),
     ]:
         if var is not None:
-            for fltr in ensure_list(var):
-                cmd_args.append(("filter", f"{fltr_name}={fltr}"))
+            prefix = f"{fltr_name}="
+            cmd_args.extend(
+                ("filter", prefix + str(fltr)) for fltr in _ensure_list(var)
+            )
 
     if id_only:
-        cmd_args.append(("format", "'{{.ID}}'"))
+        cmd_args.append(("format", "{{.ID}}"))
     elif pod_only:
-        cmd_args.append(("format", "'{{.Pod}}'"))
+        cmd_args.append(("format", "{{.Pod}}"))
 
     json = not (id_only or pod_only)
 
@@ -2572,10 +2916,7 @@ def journal(
     out = {}
 
     for unit in units["containers"]:
-        journal_lines = _journalctl(unit, runas=user)["stdout"].splitlines()
-        if len(journal_lines) > max_lines:
-            journal_lines = journal_lines[:max_lines]
-        out[unit] = "\n".join(journal_lines)
+        out[unit] = _journalctl(unit, lines=max_lines, runas=user)["stdout"]
 
     return out
 
@@ -2639,12 +2980,70 @@ def status(
     out = {}
 
     for unit in units["containers"]:
-        sctl_status = systemctl_status(unit, user)
-        out[unit] = sctl_status
+        out[unit] = systemctl_status(unit, user)
 
     return out
 
 
+def _composition_units(
+    composition,
+    project_name=None,
+    pod_prefix=None,
+    container_prefix=None,
+    separator=None,
+    user=None,
+):
+    """
+    Helper that resolves the installed units of a composition for the
+    functions managing their state. Returns a tuple of the pod unit (or None),
+    the container units and the resolved user.
+    """
+
+    composition = find_compose_file(composition)
+    project_name = project_name or _project_to_project_name(composition)
+    user = user or _find_user(composition)
+    container_prefix = container_prefix or default_container_prefix
+    pod_prefix = pod_prefix or default_pod_prefix
+
+    units = list_installed_units(
+        composition,
+        project_name=project_name,
+        container_prefix=container_prefix,
+        pod_prefix=pod_prefix,
+        separator=separator,
+        user=user,
+    )
+
+    if not (units["pods"] or units["containers"]):
+        raise CommandExecutionError(
+            f"Could not find any units belonging to project {project_name} for user {user}."
+        )
+
+    return next(iter(units["pods"]), None), list(units["containers"]), user
+
+
+def _systemctl_units(command, services, user=None):
+    """
+    Helper for running a systemctl command on the units of a composition.
+    """
+
+    _check_for_units_changes(services, user)
+    # systemctl handles multiple units in a single call and runs
+    # them in one transaction, respecting their ordering dependencies
+    _systemctl(command, params=services, runas=user)
+    return True
+
+
+def _units_matching(services, user, predicate):
+    """
+    Helper for filtering units by their properties, which are
+    queried in a single call.
+    """
+
+    states = _systemctl_show(services, user)
+    return [service for service in services if predicate(states[service])]
+
+
 def disable(
     composition,
     project_name=None,
@@ -2689,36 +3088,16 @@ def disable(
         or Salt process user. By default, defaults to the parent dir owner.
     """
 
-    composition = find_compose_file(composition)
-    project_name = project_name or _project_to_project_name(composition)
-    user = user or _find_user(composition)
-    container_prefix = container_prefix or default_container_prefix
-    pod_prefix = pod_prefix or default_pod_prefix
-
-    units = list_installed_units(
+    pod, containers, user = _composition_units(
         composition,
         project_name=project_name,
-        container_prefix=container_prefix,
         pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
         separator=separator,
         user=user,
     )
 
-    if units["pods"]:
-        disable_services = [next(iter(units["pods"]))]
-    else:
-        disable_services = list(units["containers"])
-
-    if not disable_services:
-        raise CommandExecutionError(
-            f"Could not find any units belonging to project {project_name} for user {user}."
-        )
-
-    for service in disable_services:
-        _check_for_unit_changes(service, user)
-        systemctl_disable(service, user)
-
-    return True
+    return _systemctl_units("disable", [pod] if pod else containers, user)
 
 
 def enable(
@@ -2765,36 +3144,16 @@ def enable(
         or Salt process user. By default, defaults to the parent dir owner.
     """
 
-    composition = find_compose_file(composition)
-    project_name = project_name or _project_to_project_name(composition)
-    user = user or _find_user(composition)
-    container_prefix = container_prefix or default_container_prefix
-    pod_prefix = pod_prefix or default_pod_prefix
-
-    units = list_installed_units(
+    pod, containers, user = _composition_units(
         composition,
         project_name=project_name,
-        container_prefix=container_prefix,
         pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
         separator=separator,
         user=user,
     )
 
-    if units["pods"]:
-        enable_services = [next(iter(units["pods"]))]
-    else:
-        enable_services = list(units["containers"])
-
-    if not enable_services:
-        raise CommandExecutionError(
-            f"Could not find any units belonging to project {project_name} for user {user}."
-        )
-
-    for service in enable_services:
-        _check_for_unit_changes(service, user)
-        systemctl_enable(service, user)
-
-    return True
+    return _systemctl_units("enable", [pod] if pod else containers, user)
 
 
 def restart(
@@ -2841,40 +3200,20 @@ def restart(
         or Salt process user. By default, defaults to the parent dir owner.
     """
 
-    composition = find_compose_file(composition)
-    project_name = project_name or _project_to_project_name(composition)
-    user = user or _find_user(composition)
-    container_prefix = container_prefix or default_container_prefix
-    pod_prefix = pod_prefix or default_pod_prefix
-
-    units = list_installed_units(
+    pod, containers, user = _composition_units(
         composition,
         project_name=project_name,
-        container_prefix=container_prefix,
         pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
         separator=separator,
         user=user,
     )
 
-    if units["pods"]:
-        restart_services = [next(iter(units["pods"]))]
+    if pod:
         # systemctl restart seems to fail for pods
-        systemctl_stop(restart_services[0], user)
-        func = systemctl_start
-    else:
-        restart_services = list(units["containers"])
-        func = systemctl_restart
-
-    if not restart_services:
-        raise CommandExecutionError(
-            f"Could not find any units belonging to project {project_name} for user {user}."
-        )
-
-    for service in restart_services:
-        _check_for_unit_changes(service, user)
-        func(service, user)
-
-    return True
+        systemctl_stop(pod, user)
+        return _systemctl_units("start", [pod], user)
+    return _systemctl_units("restart", containers, user)
 
 
 def start(
@@ -2921,37 +3260,16 @@ def start(
         or Salt process user. By default, defaults to the parent dir owner.
     """
 
-    composition = find_compose_file(composition)
-    project_name = project_name or _project_to_project_name(composition)
-    user = user or _find_user(composition)
-    container_prefix = container_prefix or default_container_prefix
-    pod_prefix = pod_prefix or default_pod_prefix
-
-    units = list_installed_units(
+    pod, containers, user = _composition_units(
         composition,
         project_name=project_name,
-        container_prefix=container_prefix,
         pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
         separator=separator,
         user=user,
     )
 
-    if units["pods"]:
-        start_services = [next(iter(units["pods"]))]
-    else:
-        start_services = []
-    start_services += list(units["containers"])
-
-    if not start_services:
-        raise CommandExecutionError(
-            f"Could not find any units belonging to project {project_name} for user {user}."
-        )
-
-    for service in start_services:
-        _check_for_unit_changes(service, user)
-        systemctl_start(service, user)
-
-    return True
+    return _systemctl_units("start", ([pod] if pod else []) + containers, user)
 
 
 def stop(
@@ -2998,37 +3316,16 @@ def stop(
         or Salt process user. By default, defaults to the parent dir owner.
     """
 
-    composition = find_compose_file(composition)
-    project_name = project_name or _project_to_project_name(composition)
-    user = user or _find_user(composition)
-    container_prefix = container_prefix or default_container_prefix
-    pod_prefix = pod_prefix or default_pod_prefix
-
-    units = list_installed_units(
+    pod, containers, user = _composition_units(
         composition,
         project_name=project_name,
-        container_prefix=container_prefix,
         pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
         separator=separator,
         user=user,
     )
 
-    if units["pods"]:
-        stop_services = [next(iter(units["pods"]))]
-    else:
-        stop_services = []
-    stop_services += list(units["containers"])
-
-    if not stop_services:
-        raise CommandExecutionError(
-            f"Could not find any units belonging to project {project_name} for user {user}."
-        )
-
-    for service in stop_services:
-        _check_for_unit_changes(service, user)
-        systemctl_stop(service, user)
-
-    return True
+    return _systemctl_units("stop", ([pod] if pod else []) + containers, user)
 
 
 def is_disabled(
@@ -3084,36 +3381,20 @@ def is_disabled(
         or Salt process user. By default, defaults to the parent dir owner.
     """
 
-    composition = find_compose_file(composition)
-    project_name = project_name or _project_to_project_name(composition)
-    user = user or _find_user(composition)
-    container_prefix = container_prefix or default_container_prefix
-    pod_prefix = pod_prefix or default_pod_prefix
-
-    units = list_installed_units(
+    pod, containers, user = _composition_units(
         composition,
         project_name=project_name,
-        container_prefix=container_prefix,
         pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
         separator=separator,
         user=user,
     )
 
-    if units["pods"]:
-        disabled_services = [next(iter(units["pods"]))]
-    else:
-        disabled_services = list(units["containers"])
-
-    if not disabled_services:
-        raise CommandExecutionError(
-            f"Could not find any units belonging to project {project_name} for user {user}."
-        )
-
-    enabled = []
-
-    for service in disabled_services:
-        if systemctl_is_enabled(service, user):
-            enabled.append(service)
+    enabled = _units_matching(
+        [pod] if pod else containers,
+        user,
+        lambda state: state["UnitFileState"] == "enabled",
+    )
 
     if show_missing:
         return enabled
@@ -3171,36 +3452,20 @@ def is_enabled(
         or Salt process user. By default, defaults to the parent dir owner.
     """
 
-    composition = find_compose_file(composition)
-    project_name = project_name or _project_to_project_name(composition)
-    user = user or _find_user(composition)
-    container_prefix = container_prefix or default_container_prefix
-    pod_prefix = pod_prefix or default_pod_prefix
-
-    units = list_installed_units(
+    pod, containers, user = _composition_units(
         composition,
         project_name=project_name,
-        container_prefix=container_prefix,
         pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
         separator=separator,
         user=user,
     )
 
-    if units["pods"]:
-        enabled_services = [next(iter(units["pods"]))]
-    else:
-        enabled_services = list(units["containers"])
-
-    if not enabled_services:
-        raise CommandExecutionError(
-            f"Could not find any units belonging to project {project_name} for user {user}."
-        )
-
-    disabled = []
-
-    for service in enabled_services:
-        if not systemctl_is_enabled(service, user):
-            disabled.append(service)
+    disabled = _units_matching(
+        [pod] if pod else containers,
+        user,
+        lambda state: state["UnitFileState"] != "enabled",
+    )
 
     if show_missing:
         return disabled
@@ -3258,35 +3523,22 @@ def is_running(
         or Salt process user. By default, defaults to the parent dir owner.
     """
 
-    composition = find_compose_file(composition)
-    project_name = project_name or _project_to_project_name(composition)
-    user = user or _find_user(composition)
-    container_prefix = container_prefix or default_container_prefix
-    pod_prefix = pod_prefix or default_pod_prefix
-
-    units = list_installed_units(
+    pod, containers, user = _composition_units(
         composition,
         project_name=project_name,
-        container_prefix=container_prefix,
         pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
         separator=separator,
         user=user,
     )
 
     # need to check all the services, even with pods,
     # since their status does not rely on their containers (?)
-    running_services = list(units["pods"]) + list(units["containers"])
-
-    if not running_services:
-        raise CommandExecutionError(
-            f"Could not find any units belonging to project {project_name} for user {user}."
-        )
-
-    inactive = []
-
-    for service in running_services:
-        if not systemctl_is_running(service, user):
-            inactive.append(service)
+    inactive = _units_matching(
+        ([pod] if pod else []) + containers,
+        user,
+        lambda state: state["ActiveState"] not in ACTIVE_UNIT_STATES,
+    )
 
     if show_missing:
         return inactive
@@ -3346,35 +3598,22 @@ def is_dead(
         or Salt process user. By default, defaults to the parent dir owner.
     """
 
-    composition = find_compose_file(composition)
-    project_name = project_name or _project_to_project_name(composition)
-    user = user or _find_user(composition)
-    container_prefix = container_prefix or default_container_prefix
-    pod_prefix = pod_prefix or default_pod_prefix
-
-    units = list_installed_units(
+    pod, containers, user = _composition_units(
         composition,
         project_name=project_name,
-        container_prefix=container_prefix,
         pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
         separator=separator,
         user=user,
     )
 
     # need to check all the services, even with pods,
     # since their status does not rely on their containers (?)
-    dead_services = list(units["pods"]) + list(units["containers"])
-
-    if not dead_services:
-        raise CommandExecutionError(
-            f"Could not find any units belonging to project {project_name} for user {user}."
-        )
-
-    active = []
-
-    for service in dead_services:
-        if systemctl_is_running(service, user):
-            active.append(service)
+    active = _units_matching(
+        ([pod] if pod else []) + containers,
+        user,
+        lambda state: state["ActiveState"] in ACTIVE_UNIT_STATES,
+    )
 
     if show_missing:
         return active
@@ -3396,10 +3635,18 @@ def version(user=None):
         Find podman-compose version for this user. Defaults to Salt process user.
     """
 
+    contextkey = f"compose.version.{user}"
+    binary_id = _binary_id(_which_podman_compose())
+    cached = __context__.get(contextkey)
+    if cached is not None and cached[0] == binary_id:
+        return cached[1]
+
     out = _podman_compose("version", cmd_args=["short"], runas=user, raise_error=False)
 
     if out["retcode"]:
         return False
+    # Only cache positive results since podman-compose might be installed later
+    __context__[contextkey] = (binary_id, out["stdout"])
     return out["stdout"]
 
 
@@ -3418,11 +3665,20 @@ def podman_version(user=None):
         Find podman version for this user. Defaults to Salt process user.
     """
 
+    contextkey = f"compose.podman_version.{user}"
+    binary_id = _binary_id(_which_podman())
+    cached = __context__.get(contextkey)
+    if cached is not None and cached[0] == binary_id:
+        return cached[1]
+
     out = _podman("--version", runas=user, raise_error=False)
     if out["retcode"]:
         return False
-    _version = re.findall(r"[0-9\.]+", out["stdout"])[0]
+    # podman version 4.9.3
+    _version = out["stdout"].rpartition(" ")[2].partition("-")[0]
 
+    # Only cache positive results since podman might be installed later
+    __context__[contextkey] = (binary_id, _version)
     return _version
 
 
@@ -3498,7 +3754,7 @@ def unshare(project, cmd, full=False, user=None):
     """
     project = _project_to_project_name(project)
     user = user or _try_find_user(project)
-    out = _podman("unshare", params=[cmd], runas=user)
+    out = _podman("unshare", params=shlex.split(cmd), runas=user)
     if full:
         return out
     return out["stdout"]
@@ -3511,10 +3767,9 @@ def _project_to_project_name(project):
     """
 
     if project.startswith("/"):
-        p = Path(project)
-        if not p.exists():
+        if not os.path.exists(project):
             raise SaltInvocationError(f"Absolute path '{project}' does not exist.")
-        return p.parent.name
+        return os.path.basename(os.path.dirname(project.rstrip("/")))
     return project
 
 
@@ -3557,33 +3812,42 @@ def find_compose_file(project, user=None, raise_not_found_error=True):
     on compose.ps (no salt dunder in utils).
     """
     if project.startswith("/"):
-        p = Path(project)
-        if not p.exists():
+        if not os.path.exists(project):
             if not raise_not_found_error:
                 return False
             raise SaltInvocationError(f"Absolute path '{project}' does not exist.")
         return project
 
+    # Discovering the file from existing containers needs a podman call,
+    # which most functions would repeat for the same project otherwise.
+    contextkey = f"compose.find_compose_file.{project}"
+    if user is not None:
+        contextkey += f".{user}"
+    if contextkey in __context__:
+        return __context__[contextkey]
+
     containers = ps(project=project, user=user, disable_user_automap=True)
 
-    if containers:
-        files = {
-            cnt["Labels"]["com.docker.compose.project.config_files"]
-            for cnt in containers
-            if "com.docker.compose.project.config_files" in cnt["Labels"]
-        }
+    found = None
+    for cnt in containers or []:
+        config_files = cnt["Labels"].get("com.docker.compose.project.config_files")
+        if config_files is None:
+            continue
+        if found is None:
+            found = config_files
+        elif found != config_files:
+            raise CommandExecutionError(
+                f"Tried to autodiscover files for project {project}. "
+                "Found multiple, which is currently not supported by this module."
+            )
 
-        if files:
-            if len(files) > 1:
-                raise CommandExecutionError(
-                    f"Tried to autodiscover files for project {project}. "
-                    "Found multiple, which is currently not supported by this module."
-                )
-            return files.pop()
+    if found:
+        __context__[contextkey] = found
+        return found
 
-    automapped = Path(containers_base) / project / "docker-compose.yml"
-    if automapped.exists():
-        return str(automapped)
+    automapped = os.path.join(containers_base, project, "docker-compose.yml")
+    if os.path.exists(automapped):
+        return automapped
     if not raise_not_found_error:
         return False
 
@@ -3601,15 +3865,23 @@ def _find_user(composition):
     if not default_to_dirowner:
         return None
 
-    path = Path(composition)
-    if path.exists():
-        owner = path.parent.owner()
-        if "root" == owner:
-            # Salt process should run as root already, otherwise do not force
-            return None
-        return owner
+    if not os.path.exists(composition):
+        raise SaltInvocationError(
+            f"Specified composition {composition} does not exist."
+        )
+
+    # The owner is not cached per composition since it might be
+    # changed during a run, but resolving the name is.
+    uid = os.stat(os.path.dirname(composition)).st_uid
+    contextkey = f"compose._find_user.{uid}"
+    if contextkey not in __context__:
+        __context__[contextkey] = pwd.getpwuid(uid).pw_name
 
-    raise SaltInvocationError(f"Specified composition {composition} does not exist.")
+    owner = __context__[contextkey]
+    if "root" == owner:
+        # Salt process should run as root already, otherwise do not force
+        return None
+    return owner
 
 
 def _try_find_user(project):
@@ -3619,6 +3891,10 @@ def _try_find_user(project):
     Returns None (= Salt process user) if unsuccessful.
     """
 
+    if not default_to_dirowner:
+        # _find_user would return None anyway, avoid searching for the file
+        return None
+
     try:
         compose_file = find_compose_file(project)
     except SaltInvocationError: